@@ -2,20 +2,80 @@
 BioQuery Assistant - Flask Backend
 AI-powered research assistant for molecular biology queries.
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
+import atexit
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from dotenv import load_dotenv
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 
-from prompts.bio_prompts import get_prompt, classify_query_type
+import ahocorasick
+import msgspec
+import orjson
+from cachetools import TTLCache
+
+from prompts.bio_prompts import SYSTEM_PROMPTS, GENERAL_ASSISTANT_PROMPT, get_prompt, classify_query_type
 from services.ncbi_service import NCBIService
+from services.response_cache import SemanticCache
 
 load_dotenv('.env')
 
+logger = logging.getLogger(__name__)
+
+# Configuration is fixed for the life of the process, so it is read once here
+# rather than on every request. Without a key (or with USE_MOCK_AI=true) the
+# chat endpoints answer with the fallback response.
+_OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+_USE_MOCK = os.getenv('USE_MOCK_AI', 'false').lower() == 'true'
+_OPENAI_HEADERS = None if _USE_MOCK or not _OPENAI_API_KEY else {
+    'Authorization': f'Bearer {_OPENAI_API_KEY}',
+    'Content-Type': 'application/json'
+}
+
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for faster encoding and decoding."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of a str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+class ChatRequest(msgspec.Struct):
+    """Body of a /api/chat or /api/chat/stream request."""
+    message: str = ''
+    include_literature: bool = False
+
+
+class LiteratureSearchRequest(msgspec.Struct):
+    """Body of a /api/search-literature request."""
+    query: str = ''
+    max_results: int = 5
+
+
+# Request bodies are decoded and type-checked straight from the raw bytes
+_CHAT_REQUEST_DECODER = msgspec.json.Decoder(ChatRequest)
+_LITERATURE_REQUEST_DECODER = msgspec.json.Decoder(LiteratureSearchRequest)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # CORS for frontend (Render + local dev)
 CORS(
@@ -27,97 +87,234 @@ CORS(
     supports_credentials=False
 )
 
-ncbi_service = NCBIService()
+ncbi_service = NCBIService(cache_path=os.getenv('NCBI_CACHE_PATH'))
+
+# Lifetimes (seconds) of cached completions and of literature context; an
+# answer quoting "recent" papers expires with the context it was built on
+_COMPLETION_CACHE_TTL = int(os.getenv('COMPLETION_CACHE_TTL', '86400'))
+_LITERATURE_CACHE_TTL = 3600
+
+response_cache = SemanticCache(ttl=_COMPLETION_CACHE_TTL)
+# Reported for answers served from the semantic cache, which cost no tokens
+_NO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+# Optionally keep semantic cache entries across restarts
+_SEMANTIC_CACHE_PATH = os.getenv('SEMANTIC_CACHE_PATH')
+if _SEMANTIC_CACHE_PATH:
+    response_cache.load(_SEMANTIC_CACHE_PATH)
+    atexit.register(response_cache.save, _SEMANTIC_CACHE_PATH)
+
+# Shared HTTP session so successive OpenAI calls reuse the pooled keep-alive
+# connection instead of paying a fresh TCP + TLS handshake per request.
+# Rate limits and transient upstream errors are retried with a short backoff;
+# read timeouts are not, since a resend would repeat a 30s wait.
+# A gevent worker holds many chats in flight at once; connections beyond
+# pool_maxsize are opened and thrown away, so size the pool to that
+# concurrency rather than to a thread count.
+_OPENAI_SESSION = requests.Session()
+_OPENAI_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=int(os.getenv('OPENAI_POOL_SIZE', '100')),
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({'POST'}),
+        raise_on_status=False
+    )
+))
+
+# (connect, read) seconds. An unreachable API fails fast instead of holding
+# the worker for the full generation budget.
+_OPENAI_TIMEOUT = (5, 30)
+
+# Literature lookups run here so a request can stop waiting on a slow NCBI
+_LITERATURE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='literature')
+_LITERATURE_TIMEOUT = float(os.getenv('LITERATURE_TIMEOUT', '2.5'))
+
+# Formatted literature context per search-term string, kept as long as the
+# NCBI service keeps the underlying search results
+_LITERATURE_CONTEXT_CACHE = TTLCache(maxsize=2048, ttl=_LITERATURE_CACHE_TTL)
+_LITERATURE_CONTEXT_LOCK = threading.Lock()
+
+# Completion requests currently awaiting OpenAI, keyed by _completion_key
+_INFLIGHT_COMPLETIONS = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Recently completed requests, so exact repeats (e.g. the example questions)
+# skip the round-trip entirely. Guarded by _INFLIGHT_LOCK.
+_COMPLETION_CACHE = TTLCache(maxsize=1024, ttl=_COMPLETION_CACHE_TTL)
+
+
+BIOLOGICAL_KEYWORDS = [
+    'CRISPR', 'PCR', 'qPCR', 'RNA-seq', 'DNA', 'RNA', 'protein', 'gene',
+    'cloning', 'transfection', 'knockout', 'overexpression', 'primer',
+    'sequencing', 'gel electrophoresis', 'Western blot', 'immunofluorescence',
+    'cell culture', 'bacterial culture', 'plasmid', 'vector', 'enzyme'
+]
+
+
+# Terms that mark an otherwise unclassified question as biology-related
+_BIO_GATE_KEYWORDS = (
+    'biology', 'dna', 'rna', 'protein', 'gene', 'pcr', 'crispr', 'cell', 'molecular',
+    'biochemistry', 'genetics', 'experiment', 'lab', 'assay', 'culture', 'western',
+    'blot', 'electrophoresis', 'cloning', 'transfection', 'molarity', 'concentration',
+    'primer', 'sequencing', 'plasmid', 'vector', 'enzyme', 'antibody', 'microscopy'
+)
+
+
+def _build_keyword_automaton():
+    """
+    Compile the search-term and bio-gate keywords into one Aho-Corasick automaton.
+
+    Each keyword yields (index into BIOLOGICAL_KEYWORDS or None, whether it is
+    a bio-gate keyword), so both lookups share a single set of tables.
+    """
+    entries = {}
+    for index, keyword in enumerate(BIOLOGICAL_KEYWORDS):
+        entries[keyword.lower()] = (index, False)
+    for keyword in _BIO_GATE_KEYWORDS:
+        index, _ = entries.get(keyword, (None, False))
+        entries[keyword] = (index, True)
+
+    automaton = ahocorasick.Automaton()
+    for keyword, value in entries.items():
+        automaton.add_word(keyword, value)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _has_bio_keyword(text_lower):
+    """True when the lowercased text contains any bio-gate keyword; stops at the first hit."""
+    return any(is_gate for _, (_, is_gate) in _KEYWORD_AUTOMATON.iter(text_lower))
+
+
+# Patterns used by format_response, compiled once at import instead of being
+# looked up in the re module cache on every call.
+_NUMBERED_HEADER_RE = re.compile(r'(\d+\.)\s*\*\*([^*]+)\*\*:')
+_FORMULA_RE = re.compile(r'\\?\[([^]]+)\\?\]')
+_SECTION_RE = re.compile(r'\*\*([A-Z][A-Z\s]+):\*\*')
+_SUBSECTION_RE = re.compile(r'\*\*([A-Z][a-z\s]+):\*\*')
+_PARAMETER_RE = re.compile(r'(\w+):\s*([0-9.-]+[°μM%x\s]*[A-Za-z]*)')
+# Concentration, temperature and time values. No unit starts with a digit, so
+# the three families never overlap and one scan matches what three would.
+_UNIT_VALUE_RE = re.compile(
+    r'(\d+\.?\d*)\s*(mM|μM|nM|pM|mg/mL|μg/mL|ng/mL|U/μL|units/mL|°C'
+    r'|min|minute|hr|hour|sec|second|day|week)'
+)
+_DIGIT_RE = re.compile(r'\d')
+# Anything any pass below could act on. Text without a match is returned as is.
+_HAS_MARKERS_RE = re.compile(
+    r'[*\[]|\w:\s*[0-9.-]|\n\n\n|confidence\)|^- '
+    r'|\d\.?\d*\s*(?:mM|μM|nM|pM|mg/mL|μg/mL|ng/mL|U/μL|units/mL|°C|min|hr|hour|sec|day|week)',
+    re.MULTILINE
+)
+_CONFIDENCE_RE = re.compile(r'\((High|Medium|Low) confidence\)')
+
+_CONFIDENCE_BADGES = {
+    'High': '`🔴 High Confidence`',
+    'Medium': '`🟡 Medium Confidence`',
+    'Low': '`🟢 Low Confidence`',
+}
+
+# Callout markers (*Note: ...*, *Warning: ...*, ...), one pass per label in
+# this order. A malformed callout (missing its closing *) runs into the next
+# one, and which of the two is rendered depends on the order of the passes,
+# so a single alternation would render those replies differently.
+_CALLOUT_ICONS = {
+    'Note': '📝',
+    'Warning': '⚠️',
+    'Tip': '💡',
+    'Success': '✅',
+    'Critical': '🚨',
+    'Protocol': '🧪',
+    'Troubleshoot': '🔧',
+    'Validate': '✓',
+}
+_CALLOUTS = tuple(
+    (f'*{label}:', re.compile(r'\*' + label + r':([^*]+)\*'), f'\n> {icon} **{label}:** \\1\n')
+    for label, icon in _CALLOUT_ICONS.items()
+)
+
+
+def _format_unit_value(match):
+    value, unit = match.groups()
+    # Temperatures keep the degree sign attached to the number
+    if unit == '°C':
+        return f'`{value}°C`'
+    return f'`{value} {unit}`'
+
+
+def _format_confidence(match):
+    return _CONFIDENCE_BADGES[match.group(1)]
 
 
 def format_response(response_text):
     """Enhanced response formatting with professional markdown rendering."""
     
+    # Each pass is guarded by a cheap substring check for a character its
+    # pattern requires. The checks run against the current text because
+    # earlier passes can introduce markers (callouts emit **Label:**).
+    # Plain prose without any marker skips the cascade entirely.
+    if not _HAS_MARKERS_RE.search(response_text):
+        return response_text.strip()
+    
     # Enhanced step formatting with better visual hierarchy
-    response_text = re.sub(r'(\d+\.)\s*\*\*([^*]+)\*\*:', r'\n\n### \1 \2\n', response_text)
+    if '**' in response_text:
+        response_text = _NUMBERED_HEADER_RE.sub(r'\n\n### \1 \2\n', response_text)
     
     # Formula and equation formatting - use code blocks for better rendering
-    response_text = re.sub(r'\\?\[([^]]+)\\?\]', r'`\1`', response_text)
-    
-    # Enhanced step number formatting for better readability
-    response_text = re.sub(r'^(\d+)\.\s+\*\*([^*]+)\*\*:', r'#### **Step \1: \2**', response_text, flags=re.MULTILINE)
-    
-    # Enhanced note formatting with better visual distinction
-    response_text = re.sub(r'\*Note:([^*]+)\*', r'\n> 📝 **Note:** \1\n', response_text)
+    if '[' in response_text:
+        response_text = _FORMULA_RE.sub(r'`\1`', response_text)
     
-    # Enhanced warning formatting
-    response_text = re.sub(r'\*Warning:([^*]+)\*', r'\n> ⚠️ **Warning:** \1\n', response_text)
+    # Note, warning, tip, success, critical, protocol, troubleshooting and
+    # validation callouts
+    if '*' in response_text:
+        for marker, pattern, replacement in _CALLOUTS:
+            if marker in response_text:
+                response_text = pattern.sub(replacement, response_text)
     
-    # Enhanced tip formatting
-    response_text = re.sub(r'\*Tip:([^*]+)\*', r'\n> 💡 **Tip:** \1\n', response_text)
-    
-    # Add success/validation formatting
-    response_text = re.sub(r'\*Success:([^*]+)\*', r'\n> ✅ **Success:** \1\n', response_text)
-    
-    # Add critical information formatting
-    response_text = re.sub(r'\*Critical:([^*]+)\*', r'\n> 🚨 **Critical:** \1\n', response_text)
-    
-    # Add protocol step formatting
-    response_text = re.sub(r'\*Protocol:([^*]+)\*', r'\n> 🧪 **Protocol:** \1\n', response_text)
-    
-    # Add troubleshooting formatting
-    response_text = re.sub(r'\*Troubleshoot:([^*]+)\*', r'\n> 🔧 **Troubleshoot:** \1\n', response_text)
-    
-    # Add validation formatting
-    response_text = re.sub(r'\*Validate:([^*]+)\*', r'\n> ✓ **Validate:** \1\n', response_text)
-    
-    # Enhanced section header formatting - use proper markdown headers
-    response_text = re.sub(r'\*\*([A-Z][A-Z\s]+):\*\*', r'\n\n## \1\n', response_text)
-    
-    # Enhanced subsection formatting
-    response_text = re.sub(r'\*\*([A-Z][a-z\s]+):\*\*', r'\n\n### \1\n', response_text)
+    if ':**' in response_text:
+        # Enhanced section header formatting - use proper markdown headers
+        response_text = _SECTION_RE.sub(r'\n\n## \1\n', response_text)
+        
+        # Enhanced subsection formatting
+        response_text = _SUBSECTION_RE.sub(r'\n\n### \1\n', response_text)
     
     # Add parameter highlighting - use bold for emphasis
-    response_text = re.sub(r'(\w+):\s*([0-9.-]+[°μM%x\s]*[A-Za-z]*)', r'**\1:** `\2`', response_text)
-    
-    # Add concentration highlighting - use inline code for better visibility
-    response_text = re.sub(r'(\d+\.?\d*)\s*(mM|μM|nM|pM|mg/mL|μg/mL|ng/mL|U/μL|units/mL)', r'`\1 \2`', response_text)
+    if ':' in response_text:
+        response_text = _PARAMETER_RE.sub(r'**\1:** `\2`', response_text)
     
-    # Add temperature highlighting
-    response_text = re.sub(r'(\d+\.?\d*)\s*°C', r'`\1°C`', response_text)
+    # Add concentration, temperature and time highlighting - use inline code
+    # for better visibility
+    if _DIGIT_RE.search(response_text):
+        response_text = _UNIT_VALUE_RE.sub(_format_unit_value, response_text)
     
-    # Add time highlighting
-    response_text = re.sub(r'(\d+\.?\d*)\s*(min|minute|hr|hour|sec|second|day|week)', r'`\1 \2`', response_text)
-    
-    # Clean up excessive whitespace
-    response_text = re.sub(r'\n\n+', '\n\n', response_text)
+    # Clean up excessive whitespace. Each replace shortens every run of
+    # newlines, so this loops only as often as the longest run requires.
+    while '\n\n\n' in response_text:
+        response_text = response_text.replace('\n\n\n', '\n\n')
     
     # Add confidence level indicators - use badges
-    response_text = re.sub(r'\(High confidence\)', r'`🔴 High Confidence`', response_text)
-    response_text = re.sub(r'\(Medium confidence\)', r'`🟡 Medium Confidence`', response_text)
-    response_text = re.sub(r'\(Low confidence\)', r'`🟢 Low Confidence`', response_text)
+    if 'confidence)' in response_text:
+        response_text = _CONFIDENCE_RE.sub(_format_confidence, response_text)
     
     # Add bullet point formatting for lists
-    response_text = re.sub(r'^- ', r'• ', response_text, flags=re.MULTILINE)
-    
-    # Add numbered list formatting
-    response_text = re.sub(r'^(\d+)\. ', r'\1. ', response_text, flags=re.MULTILINE)
-    
-    # Add code block formatting for protocols
-    response_text = re.sub(r'```\n(.*?)\n```', r'```\n\1\n```', response_text, flags=re.DOTALL)
+    if '- ' in response_text:
+        if response_text.startswith('- '):
+            response_text = '• ' + response_text[2:]
+        response_text = response_text.replace('\n- ', '\n• ')
     
     return response_text.strip()
 
 
-def call_openai_api(messages, max_tokens=2000, temperature=0.3):
-    """Enhanced API call with optimized parameters for scientific accuracy."""
-    api_key = os.getenv('OPENAI_API_KEY')
-    use_mock = False
-
-    if use_mock or not api_key:
-        return get_mock_response(messages)
-
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-
-    data = {
+def _openai_request_data(messages, max_tokens, temperature):
+    """Build the chat completion request body shared by blocking and streaming calls."""
+    return {
         'model': 'gpt-4o-mini',  # Using gpt-4o-mini for better performance
         'messages': messages,
         'max_tokens': max_tokens,
@@ -128,27 +325,122 @@ def call_openai_api(messages, max_tokens=2000, temperature=0.3):
         'stop': None  # No stop sequences for scientific content
     }
 
+
+def _completion_key(messages, max_tokens, temperature):
+    """Stable digest identifying a chat completion request, model and sampling parameters included."""
+    data = _openai_request_data(messages, max_tokens, temperature)
+    blob = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def call_openai_api(messages, max_tokens=2000, temperature=0.3):
+    """
+    Get a chat completion, reusing recent and in-flight identical requests.
+
+    A prompt answered within COMPLETION_CACHE_TTL seconds is served from
+    memory. When the same prompt is already in flight (e.g. several users
+    clicking the same example question), later callers wait for that call's
+    result instead of issuing their own round-trip to OpenAI.
+    """
+    key = _completion_key(messages, max_tokens, temperature)
+    with _INFLIGHT_LOCK:
+        cached = _COMPLETION_CACHE.get(key)
+        if cached is not None:
+            return cached
+        future = _INFLIGHT_COMPLETIONS.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = _INFLIGHT_COMPLETIONS[key] = Future()
+
+    if not is_leader:
+        return future.result()
+
     try:
-        response = requests.post(
+        response_data = _request_completion(messages, max_tokens, temperature)
+        # Fallback answers are not worth keeping once OpenAI is reachable again
+        if not response_data.get('mock'):
+            with _INFLIGHT_LOCK:
+                _COMPLETION_CACHE[key] = response_data
+        future.set_result(response_data)
+        return response_data
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            del _INFLIGHT_COMPLETIONS[key]
+
+
+def _request_completion(messages, max_tokens, temperature):
+    """Enhanced API call with optimized parameters for scientific accuracy."""
+    if _OPENAI_HEADERS is None:
+        return get_mock_response(messages)
+
+    data = _openai_request_data(messages, max_tokens, temperature)
+
+    try:
+        response = _OPENAI_SESSION.post(
             'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=30
+            headers=_OPENAI_HEADERS,
+            data=orjson.dumps(data),
+            timeout=_OPENAI_TIMEOUT
         )
 
         if response.status_code != 200:
+            logger.warning("OpenAI request failed with status %s", response.status_code)
             return get_mock_response(messages)
 
-        return response.json()
+        return orjson.loads(response.content)
 
     except Exception:
+        logger.warning("OpenAI request failed", exc_info=True)
         return get_mock_response(messages)
 
 
-def get_mock_response(messages):
-    user_message = messages[-1]['content'] if messages else "No message"
+def stream_openai_api(messages, max_tokens=2000, temperature=0.3):
+    """Yield completion text deltas as the model generates them."""
+    if _OPENAI_HEADERS is None:
+        yield get_mock_response(messages)['choices'][0]['message']['content']
+        return
+
+    data = _openai_request_data(messages, max_tokens, temperature)
+    data['stream'] = True
 
-    mock_content = f"""I'm currently experiencing technical difficulties connecting to the AI service. 
+    streamed = False
+    try:
+        with _OPENAI_SESSION.post(
+            'https://api.openai.com/v1/chat/completions',
+            headers=_OPENAI_HEADERS,
+            data=orjson.dumps(data),
+            timeout=_OPENAI_TIMEOUT,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                logger.warning("OpenAI stream failed with status %s", response.status_code)
+                yield get_mock_response(messages)['choices'][0]['message']['content']
+                return
+
+            for line in response.iter_lines():
+                if not line.startswith(b'data: '):
+                    continue
+                chunk = line[len(b'data: '):]
+                if chunk == b'[DONE]':
+                    break
+                delta = orjson.loads(chunk)['choices'][0]['delta'].get('content')
+                if delta:
+                    streamed = True
+                    yield delta
+
+    except Exception:
+        logger.warning("OpenAI stream failed", exc_info=True)
+        # Only fall back if nothing reached the client; a half-streamed answer
+        # followed by the fallback text would be confusing
+        if not streamed:
+            yield get_mock_response(messages)['choices'][0]['message']['content']
+
+
+# Fallback answer used when the AI service is unreachable or not configured
+_MOCK_RESPONSE_TEMPLATE = """I'm currently experiencing technical difficulties connecting to the AI service. 
 
 Your question: "{user_message}"
 
@@ -156,14 +448,25 @@ This is a temporary fallback response. Please try again in a moment, or check th
 
 *Note: This is a temporary mock response due to API connectivity issues.*"""
 
+
+def get_mock_response(messages):
+    user_message = messages[-1]['content'] if messages else "No message"
+
+    mock_content = _MOCK_RESPONSE_TEMPLATE.format(user_message=user_message)
+
+    # Rough ~4 chars/token estimate; the length of the space-joined prompt is
+    # summed directly rather than materializing the joined string
+    prompt_chars = sum(len(m['content']) for m in messages) + max(len(messages) - 1, 0)
+
     return {
+        'mock': True,
         'choices': [{
             'message': {'content': mock_content}
         }],
         'usage': {
-            'prompt_tokens': len(' '.join([m['content'] for m in messages])) // 4,
+            'prompt_tokens': prompt_chars // 4,
             'completion_tokens': len(mock_content) // 4,
-            'total_tokens': (len(' '.join([m['content'] for m in messages])) + len(mock_content)) // 4
+            'total_tokens': (prompt_chars + len(mock_content)) // 4
         }
     }
 
@@ -177,71 +480,154 @@ def health_check():
     })
 
 
+# System messages never change between requests, so they are built once and
+# shared by every conversation; nothing on the request path mutates them
+_SYSTEM_MESSAGES = {
+    query_type: {"role": "system", "content": get_prompt(query_type)}
+    for query_type in SYSTEM_PROMPTS
+}
+
+# Used instead of the expert prompt when a question shows no sign of biology
+_GENERAL_ASSISTANT_MESSAGE = {"role": "system", "content": GENERAL_ASSISTANT_PROMPT}
+
+
+# Repeated questions (the example prompts above all) skip reclassification.
+# Callers pass the lowercased message, so questions differing only in case
+# share an entry.
+@lru_cache(maxsize=4096)
+def classify_and_prompt(message_lower):
+    """Classify a lowercased message and pick the system message that goes with it."""
+    query_type = classify_query_type(message_lower)
+    system_message = _SYSTEM_MESSAGES.get(query_type, _SYSTEM_MESSAGES["general_bio"])
+
+    # Any gate keyword hit keeps the expert prompt
+    if query_type == "general_bio" and not _has_bio_keyword(message_lower):
+        system_message = _GENERAL_ASSISTANT_MESSAGE
+
+    return query_type, system_message
+
+
+def fetch_literature_context(user_message, message_lower):
+    """
+    Search PubMed for the message's key terms and format the hits for the LLM.
+
+    Returns "" when the search finds no papers or fails, so callers can treat
+    any non-empty result as real literature.
+    """
+    try:
+        search_terms = extract_search_terms(user_message, message_lower)
+        if search_terms:
+            with _LITERATURE_CONTEXT_LOCK:
+                cached = _LITERATURE_CONTEXT_CACHE.get(search_terms)
+            if cached is not None:
+                return cached
+
+            papers = ncbi_service.get_recent_papers(search_terms, max_results=3)
+            # An empty result may be a failed search, so it is neither cached
+            # nor passed on as context
+            if not papers:
+                return ""
+            literature_context = ncbi_service.format_articles_for_llm(papers)
+            with _LITERATURE_CONTEXT_LOCK:
+                _LITERATURE_CONTEXT_CACHE[search_terms] = literature_context
+            return literature_context
+    except Exception:
+        logger.warning("Literature lookup failed", exc_info=True)
+    return ""
+
+
+def start_literature_lookup(user_message, message_lower, include_literature):
+    """Begin the PubMed lookup in the background, or return None when it was not requested."""
+    if not include_literature:
+        return None
+    return _LITERATURE_EXECUTOR.submit(fetch_literature_context, user_message, message_lower)
+
+
+def build_chat_messages(user_message, system_message, literature_future=None):
+    """
+    Assemble the system prompt, optional literature context and user turn for a chat request.
+
+    literature_future comes from start_literature_lookup, so the NCBI
+    round-trips run on the literature pool while this thread waits on them
+    with a bounded timeout.
+
+    The static system prompt always comes first and everything per-request
+    (question, literature) after it, so OpenAI's automatic prompt caching can
+    reuse the prompt prefix across requests of the same query type.
+    """
+    literature_context = ""
+    if literature_future is not None:
+        # NCBI is given a bounded share of the request's latency. A lookup
+        # that misses the deadline while running keeps going and fills the
+        # PubMed cache, so the next question on the topic gets its literature
+        # instantly. One still queued is dropped: under sustained load NCBI's
+        # rate limit would otherwise grow the queue without bound.
+        try:
+            literature_context = literature_future.result(timeout=_LITERATURE_TIMEOUT)
+        except FuturesTimeoutError:
+            literature_future.cancel()
+            logger.info("Literature lookup exceeded %ss; answering without it", _LITERATURE_TIMEOUT)
+
+    if literature_context:
+        enhanced_message = f"{user_message}\n\nRelevant recent literature:\n{literature_context}"
+        messages = [system_message, {"role": "user", "content": enhanced_message}]
+    else:
+        messages = [system_message, {"role": "user", "content": user_message}]
+
+    return messages, literature_context
+
+
+def finalize_response(raw_message, query_type):
+    """Score a raw completion, flag low-quality answers and render it as markdown."""
+    # Quality control checks
+    quality_score = assess_response_quality(raw_message, query_type)
+    
+    # Apply quality-based formatting
+    if quality_score < 0.7:
+        # Add quality warning to response
+        raw_message = f"*Note: This response may need additional validation. Please cross-reference with primary literature.*\n\n{raw_message}"
+    
+    return format_response(raw_message), quality_score
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
-        data = request.get_json()
-        user_message = data.get('message', '').strip()
-        include_literature = data.get('include_literature', False)
+        chat_request = _CHAT_REQUEST_DECODER.decode(request.get_data())
+        user_message = chat_request.message.strip()
+        include_literature = chat_request.include_literature
 
         if not user_message:
             return jsonify({"error": "Message is required"}), 400
 
-        query_type = classify_query_type(user_message)
-        system_prompt = get_prompt(query_type)
-
-        if query_type == "general_bio" and not any(keyword in user_message.lower() for keyword in [
-            'biology', 'dna', 'rna', 'protein', 'gene', 'pcr', 'crispr', 'cell', 'molecular',
-            'biochemistry', 'genetics', 'experiment', 'lab', 'assay', 'culture', 'western',
-            'blot', 'electrophoresis', 'cloning', 'transfection', 'molarity', 'concentration',
-            'primer', 'sequencing', 'plasmid', 'vector', 'enzyme', 'antibody', 'microscopy'
-        ]):
-            system_prompt = """
-You are a helpful biology research assistant. 
-When providing step-by-step instructions, use this format:
+        # Lowercased once for classification, the bio gate and search terms
+        message_lower = user_message.lower()
 
-**Step 1: Symptoms**
-Your content here...
+        query_type, system_message = classify_and_prompt(message_lower)
+        logger.debug("Processing %s query: %.50s", query_type, user_message)
 
-**Step 2: Template** 
-Your content here...
-
-Do NOT use HTML tags. Use Markdown formatting instead.
-"""
+        # Near-duplicate questions in the same context reuse the stored answer;
+        # general_bio questions can go to either the expert or the general
+        # assistant prompt, so the prompt is part of the context
+        prompt_name = "general_assistant" if system_message is _GENERAL_ASSISTANT_MESSAGE else query_type
+        cache_partition = (query_type, prompt_name, include_literature)
+        cached = response_cache.lookup(user_message, cache_partition)
+        if cached is not None:
+            # Nothing was spent on this answer; the stored usage is the original call's
+            return jsonify({**cached, "usage": _NO_USAGE, "cache_hit": "semantic"})
 
-        literature_context = ""
-        if include_literature:
-            try:
-                search_terms = extract_search_terms(user_message)
-                if search_terms:
-                    papers = ncbi_service.get_recent_papers(search_terms, max_results=3)
-                    literature_context = ncbi_service.format_articles_for_llm(papers)
-            except Exception:
-                literature_context = "Literature search unavailable at the moment."
-
-        messages = [{"role": "system", "content": system_prompt}]
-        if literature_context:
-            enhanced_message = f"{user_message}\n\nRelevant recent literature:\n{literature_context}"
-            messages.append({"role": "user", "content": enhanced_message})
-        else:
-            messages.append({"role": "user", "content": user_message})
+        # Only started on a miss: a cancelled future may already be running,
+        # and semantic hits must not spend NCBI's rate limit
+        literature_future = start_literature_lookup(user_message, message_lower, include_literature)
+        messages, literature_context = build_chat_messages(user_message, system_message, literature_future)
 
         response_data = call_openai_api(messages)
 
         raw_message = response_data['choices'][0]['message']['content']
-        
-        # Quality control checks
-        quality_score = assess_response_quality(raw_message, query_type)
-        
-        # Apply quality-based formatting
-        if quality_score < 0.7:
-            # Add quality warning to response
-            raw_message = f"*Note: This response may need additional validation. Please cross-reference with primary literature.*\n\n{raw_message}"
-        
-        assistant_message = format_response(raw_message)
+        assistant_message, quality_score = finalize_response(raw_message, query_type)
         usage = response_data.get('usage', {})
 
-        return jsonify({
+        payload = {
             "response": assistant_message,
             "query_type": query_type,
             "literature_included": bool(literature_context),
@@ -252,18 +638,77 @@ Do NOT use HTML tags. Use Markdown formatting instead.
                 "completion_tokens": usage.get('completion_tokens', 0),
                 "total_tokens": usage.get('total_tokens', 0)
             }
-        })
+        }
+
+        # Fallback answers, and answers that were meant to include literature
+        # but went without it, must not be served for later similar questions
+        if not response_data.get('mock') and (literature_context or not include_literature):
+            response_cache.store(user_message, cache_partition, payload,
+                                 ttl=_LITERATURE_CACHE_TTL if include_literature else None)
+
+        return jsonify(payload)
+
+    except msgspec.DecodeError:
+        return jsonify({"error": "Invalid request body"}), 400
+    except Exception:
+        logger.exception("Chat request failed")
+        return jsonify({"error": "An error occurred processing your request"}), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the answer as Server-Sent Events so the client can render it incrementally."""
+    try:
+        chat_request = _CHAT_REQUEST_DECODER.decode(request.get_data())
+        user_message = chat_request.message.strip()
+        include_literature = chat_request.include_literature
+
+        if not user_message:
+            return jsonify({"error": "Message is required"}), 400
+
+        # Lowercased once for classification, the bio gate and search terms
+        message_lower = user_message.lower()
+        literature_future = start_literature_lookup(user_message, message_lower, include_literature)
 
+        query_type, system_message = classify_and_prompt(message_lower)
+        messages, literature_context = build_chat_messages(user_message, system_message, literature_future)
+
+    except msgspec.DecodeError:
+        return jsonify({"error": "Invalid request body"}), 400
     except Exception:
+        logger.exception("Chat request failed")
         return jsonify({"error": "An error occurred processing your request"}), 500
 
+    def generate():
+        parts = []
+        for delta in stream_openai_api(messages):
+            parts.append(delta)
+            yield b'data: ' + orjson.dumps({"delta": delta}) + b'\n\n'
+
+        # Formatting needs the whole answer (headers and callouts can span
+        # deltas), so the client swaps the raw stream for this final render.
+        assistant_message, quality_score = finalize_response(''.join(parts), query_type)
+        yield b'event: done\ndata: ' + orjson.dumps({
+            "response": assistant_message,
+            "query_type": query_type,
+            "literature_included": bool(literature_context),
+            "quality_score": quality_score,
+            "confidence_level": get_confidence_level(quality_score)
+        }) + b'\n\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 
 @app.route('/api/search-literature', methods=['POST'])
 def search_literature():
     try:
-        data = request.get_json()
-        query = data.get('query', '').strip()
-        max_results = min(data.get('max_results', 5), 10)
+        search_request = _LITERATURE_REQUEST_DECODER.decode(request.get_data())
+        query = search_request.query.strip()
+        max_results = min(search_request.max_results, 10)
 
         if not query:
             return jsonify({"error": "Query is required"}), 400
@@ -276,38 +721,67 @@ def search_literature():
             "count": len(papers)
         })
 
+    except msgspec.DecodeError:
+        return jsonify({"error": "Invalid request body"}), 400
     except Exception:
+        logger.exception("Literature search failed")
         return jsonify({"error": "Literature search failed"}), 500
 
 
+EXAMPLES = {
+    "pcr_troubleshooting": [
+        "My PCR isn't working - I'm trying to amplify a 1.2kb fragment from mouse genomic DNA",
+        "I'm getting multiple bands in my PCR, how can I optimize for specificity?",
+        "What's the optimal annealing temperature for primers with 60% GC content?"
+    ],
+    "experimental_design": [
+        "I want to study gene expression changes after drug treatment, what controls should I include?",
+        "How many biological replicates do I need for RNA-seq experiment?",
+        "I'm designing a CRISPR knockout experiment, what validation steps should I plan?"
+    ],
+    "protocol_help": [
+        "What's the best method for isolating high-quality RNA from tissue samples?",
+        "I need to optimize my Western blot protocol for a low-abundance protein",
+        "How should I prepare competent cells for electroporation?"
+    ],
+    "literature_search": [
+        "Find recent papers about CRISPR applications in cancer therapy",
+        "What are the latest developments in mRNA vaccine technology?",
+        "Show me studies comparing different DNA extraction methods"
+    ]
+}
+
+# The examples never change at runtime, so serialize them once and let
+# clients revalidate against a content-derived ETag.
+_EXAMPLES_JSON = orjson.dumps(EXAMPLES)
+_EXAMPLES_ETAG = hashlib.sha1(_EXAMPLES_JSON).hexdigest()
+_EXAMPLES_HEADERS = {'Cache-Control': 'public, max-age=86400'}
+
+
 @app.route('/api/examples', methods=['GET'])
 def get_examples():
-    examples = {
-        "pcr_troubleshooting": [
-            "My PCR isn't working - I'm trying to amplify a 1.2kb fragment from mouse genomic DNA",
-            "I'm getting multiple bands in my PCR, how can I optimize for specificity?",
-            "What's the optimal annealing temperature for primers with 60% GC content?"
-        ],
-        "experimental_design": [
-            "I want to study gene expression changes after drug treatment, what controls should I include?",
-            "How many biological replicates do I need for RNA-seq experiment?",
-            "I'm designing a CRISPR knockout experiment, what validation steps should I plan?"
-        ],
-        "protocol_help": [
-            "What's the best method for isolating high-quality RNA from tissue samples?",
-            "I need to optimize my Western blot protocol for a low-abundance protein",
-            "How should I prepare competent cells for electroporation?"
-        ],
-        "literature_search": [
-            "Find recent papers about CRISPR applications in cancer therapy",
-            "What are the latest developments in mRNA vaccine technology?",
-            "Show me studies comparing different DNA extraction methods"
-        ]
-    }
+    response = Response(_EXAMPLES_JSON, mimetype='application/json', headers=_EXAMPLES_HEADERS)
+    response.set_etag(_EXAMPLES_ETAG)
+    return response.make_conditional(request)
 
-    return jsonify(examples)
 
+# Patterns used by assess_response_quality
+_QUALITY_VALUE_RE = re.compile(r'\d+\.?\d*\s*(mM|μM|nM|°C|min|hr)')
+_QUALITY_STEP_RE = re.compile(r'\d+\.\s+')
 
+_SCIENTIFIC_TERMS = ('control', 'replicate', 'validation', 'protocol', 'optimization', 'troubleshooting')
+
+# Terms a complete answer of each query type is expected to mention
+_COMPLETENESS_TERMS = {
+    "pcr_troubleshooting": ('temperature', 'primer', 'template'),
+    "experimental_design": ('control', 'replicate', 'sample'),
+    "literature_synthesis": ('study', 'research', 'evidence'),
+}
+
+
+# Responses come back verbatim from the completion cache, so identical texts
+# recur; the cache stays small because each key holds a full response.
+@lru_cache(maxsize=256)
 def assess_response_quality(response_text, query_type):
     """Assess the quality of AI response based on scientific rigor and completeness."""
     quality_indicators = {
@@ -319,31 +793,28 @@ def assess_response_quality(response_text, query_type):
     }
     
     # Check for specific parameters and values
-    if re.search(r'\d+\.?\d*\s*(mM|μM|nM|°C|min|hr)', response_text):
+    if _QUALITY_VALUE_RE.search(response_text):
         quality_indicators['specificity'] += 0.3
     
+    # Lowercased once for every term check below
+    text_lower = response_text.lower()
+    
     # Check for scientific terminology and methodology
-    scientific_terms = ['control', 'replicate', 'validation', 'protocol', 'optimization', 'troubleshooting']
-    if sum(1 for term in scientific_terms if term.lower() in response_text.lower()) >= 3:
+    if sum(1 for term in _SCIENTIFIC_TERMS if term in text_lower) >= 3:
         quality_indicators['scientific_rigor'] += 0.3
     
     # Check for structured format
-    if re.search(r'\*\*[A-Z][A-Z\s]+:\*\*', response_text):
+    if _SECTION_RE.search(response_text):
         quality_indicators['structure'] += 0.2
     
     # Check for step-by-step instructions
-    if re.search(r'\d+\.\s+', response_text):
+    if _QUALITY_STEP_RE.search(response_text):
         quality_indicators['actionability'] += 0.2
     
     # Check for completeness based on query type
-    if query_type == "pcr_troubleshooting":
-        if all(term in response_text.lower() for term in ['temperature', 'primer', 'template']):
-            quality_indicators['completeness'] += 0.3
-    elif query_type == "experimental_design":
-        if all(term in response_text.lower() for term in ['control', 'replicate', 'sample']):
-            quality_indicators['completeness'] += 0.3
-    elif query_type == "literature_synthesis":
-        if all(term in response_text.lower() for term in ['study', 'research', 'evidence']):
+    completeness_terms = _COMPLETENESS_TERMS.get(query_type)
+    if completeness_terms:
+        if all(term in text_lower for term in completeness_terms):
             quality_indicators['completeness'] += 0.3
     else:
         if len(response_text) > 500:  # General bio responses should be comprehensive
@@ -364,24 +835,26 @@ def get_confidence_level(quality_score):
         return "Low"
 
 
-def extract_search_terms(query):
-    biological_keywords = [
-        'CRISPR', 'PCR', 'qPCR', 'RNA-seq', 'DNA', 'RNA', 'protein', 'gene',
-        'cloning', 'transfection', 'knockout', 'overexpression', 'primer',
-        'sequencing', 'gel electrophoresis', 'Western blot', 'immunofluorescence',
-        'cell culture', 'bacterial culture', 'plasmid', 'vector', 'enzyme'
-    ]
+def extract_search_terms(query, query_lower=None):
+    if query_lower is None:
+        query_lower = query.lower()
 
-    query_lower = query.lower()
-    found_keywords = [kw for kw in biological_keywords if kw.lower() in query_lower]
+    # One pass over the query finds every keyword, including overlapping ones
+    found = {
+        index for _, (index, _) in _KEYWORD_AUTOMATON.iter(query_lower)
+        if index is not None
+    }
 
-    if found_keywords:
-        return " ".join(found_keywords[:3])
+    if found:
+        return " ".join(BIOLOGICAL_KEYWORDS[index] for index in sorted(found)[:3])
     else:
-        words = query.split()[:5]
+        # Stop splitting after the fifth word instead of tokenizing the whole query
+        words = query.split(maxsplit=5)[:5]
         return " ".join(words)
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # The interactive debugger is opt-in; never enable it on a reachable host
+    debug = os.environ.get("FLASK_DEBUG", "false").lower() in ("1", "true")
+    app.run(host="0.0.0.0", port=port, debug=debug)
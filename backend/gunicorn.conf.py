@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for the BioQuery Assistant backend.
+Requests spend nearly all their time waiting on OpenAI and NCBI, so gevent
+workers let each process keep many of them in flight at once.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# A single gevent worker already holds many requests in flight. Each extra
+# process gets its own NCBI rate limiter (multiplying the per-IP budget),
+# its own response caches and a competing atexit cache save, so scale with
+# WEB_CONCURRENCY only when one process's CPU is the bottleneck
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+# gevent by default; GUNICORN_WORKER_CLASS=gthread (with GUNICORN_THREADS)
+# is a fallback for environments where gevent's monkey-patching misbehaves
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = 1000
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+keepalive = 30
+timeout = 60
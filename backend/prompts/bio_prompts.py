@@ -3,7 +3,13 @@ Specialized prompts for biological research assistance.
 These prompts leverage domain expertise to provide accurate, actionable advice.
 """
 
-SYSTEM_PROMPTS = {
+from types import MappingProxyType
+
+import ahocorasick
+
+# Read-only: app.py and the completion cache key assume the prompts never
+# change after import
+SYSTEM_PROMPTS = MappingProxyType({
     "general_bio": """You are a world-renowned molecular biologist with 20+ years of hands-on laboratory experience and 150+ peer-reviewed publications. You are the go-to expert for:
 
 **CORE EXPERTISE:**
@@ -460,21 +466,61 @@ Remember: Good experimental design is the foundation of reliable science. Every
 - Evaluate funding sources and potential bias
 
 Remember: Literature synthesis is about finding truth through critical analysis, not just summarizing papers. Always question, compare, and synthesize evidence objectively."""
-}
+})
+
+# Short prompt for questions that show no sign of biology; the expert
+# personas above would otherwise answer small talk in protocol format
+GENERAL_ASSISTANT_PROMPT = """
+You are a helpful biology research assistant. 
+When providing step-by-step instructions, use this format:
+
+**Step 1: Symptoms**
+Your content here...
+
+**Step 2: Template** 
+Your content here...
+
+Do NOT use HTML tags. Use Markdown formatting instead.
+"""
 
 def get_prompt(prompt_type="general_bio"):
     """Get a specialized prompt for different types of biological queries."""
     return SYSTEM_PROMPTS.get(prompt_type, SYSTEM_PROMPTS["general_bio"])
 
+
+# Keyword rules in priority order: the first category with any keyword in the
+# query wins, and anything unmatched falls back to general_bio
+_QUERY_TYPE_RULES = (
+    ("pcr_troubleshooting", ("pcr", "amplification", "primer", "annealing", "polymerase")),
+    ("experimental_design", ("design", "experiment", "control", "replicate", "statistical")),
+    ("literature_synthesis", ("papers", "literature", "studies", "research", "compare")),
+)
+
+
+def _build_classifier():
+    """Compile every rule keyword into one automaton mapping it to its rule's priority."""
+    automaton = ahocorasick.Automaton()
+    for priority, (_, keywords) in enumerate(_QUERY_TYPE_RULES):
+        for keyword in keywords:
+            automaton.add_word(keyword, priority)
+    automaton.make_automaton()
+    return automaton
+
+
+_CLASSIFIER = _build_classifier()
+
+
 def classify_query_type(user_query):
     """Simple classification to determine which specialized prompt to use."""
-    query_lower = user_query.lower()
-    
-    if any(keyword in query_lower for keyword in ["pcr", "amplification", "primer", "annealing", "polymerase"]):
-        return "pcr_troubleshooting"
-    elif any(keyword in query_lower for keyword in ["design", "experiment", "control", "replicate", "statistical"]):
-        return "experimental_design"
-    elif any(keyword in query_lower for keyword in ["papers", "literature", "studies", "research", "compare"]):
-        return "literature_synthesis"
+    # One walk over the query finds keywords of every category at once
+    best = len(_QUERY_TYPE_RULES)
+    for _, priority in _CLASSIFIER.iter(user_query.lower()):
+        if priority < best:
+            best = priority
+            if best == 0:
+                break
+
+    if best < len(_QUERY_TYPE_RULES):
+        return _QUERY_TYPE_RULES[best][0]
     else:
-        return "general_bio"
\ No newline at end of file
+        return "general_bio"
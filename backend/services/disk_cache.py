@@ -0,0 +1,45 @@
+"""
+SQLite-backed key/value cache with per-entry expiry.
+Lets cached NCBI results survive restarts and be shared by every worker process on a host.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import orjson
+
+
+class DiskCache:
+    """Persistent TTL cache storing JSON-serializable values in a SQLite file."""
+
+    def __init__(self, path: str, ttl: float = 86400):
+        """Open (or create) the cache file; entries expire ttl seconds after being stored."""
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # One connection shared by the process's threads, serialized by _lock;
+        # SQLite's own file locking arbitrates between worker processes
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None when it is missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, replacing any previous entry and dropping expired ones."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, orjson.dumps(value), now + self.ttl)
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
@@ -3,23 +3,157 @@ NCBI E-utilities service for retrieving scientific literature and database infor
 Uses the free NCBI API to search PubMed and other databases.
 """
 
+import logging
+
 import requests
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util.retry import Retry
+from lxml import etree as ET
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
 import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
+import orjson
+
+from .disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# What a failed E-utilities round-trip raises: transport/HTTP errors (urllib3
+# ones surface directly while the streamed body is read), or a truncated or
+# malformed XML body
+_NCBI_ERRORS = (requests.RequestException, Urllib3HTTPError, ET.ParseError)
+
+
+@dataclass(slots=True, frozen=True)
+class Article:
+    """A PubMed article as returned by NCBIService searches."""
+    pmid: str
+    title: str
+    authors: Tuple[str, ...]  # at most the first three
+    abstract: str
+    year: str
+    journal: str
+    url: str
+
+
+def abstracts(articles: List[Article]) -> List[str]:
+    """Collect the abstracts of a list of articles, e.g. for one batched embedding call."""
+    return [article.abstract for article in articles]
+
+
+def embed_articles(articles: List[Article], embed_batch: Callable[[List[str]], Sequence]) -> Sequence:
+    """
+    Embed every article's abstract with a single batched call.
+
+    Args:
+        articles: Articles from a search
+        embed_batch: Embedder taking the whole list of texts at once (e.g. a
+            tokenizer-plus-model wrapper or an embeddings API client)
+
+    Returns:
+        Whatever embed_batch returns, one embedding per article in order.
+    """
+    return embed_batch(abstracts(articles))
+
+
+def _truncate_at_sentence(text: str, max_chars: int = 500) -> str:
+    """
+    Shorten text to at most max_chars, ending on a sentence (or failing that,
+    word) boundary. A "..." marker is appended after the cut so the reader
+    knows text is missing.
+    """
+    if len(text) <= max_chars:
+        return text
+    
+    cut = text[:max_chars]
+    # Only settle for a boundary that keeps at least half the budget. The
+    # extra character lets a sentence ending exactly at the limit count.
+    sentence_end = text.rfind(". ", 0, max_chars + 1)
+    if sentence_end >= max_chars // 2:
+        return cut[:sentence_end + 1] + " ..."
+    word_end = cut.rfind(" ")
+    if word_end >= max_chars // 2:
+        return cut[:word_end] + "..."
+    return cut + "..."
+
 
 class NCBIService:
     """Service for interacting with NCBI databases via E-utilities."""
     
     BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
     
-    def __init__(self, email: str = "bioquery@example.com", tool: str = "bioquery-assistant"):
-        """Initialize NCBI service with contact information."""
+    # Compiled once; evaluated in libxml2 for every parsed article
+    _AUTHORS_XPATH = ET.XPath("AuthorList/Author")
+    
+    # (connect, read) seconds for every E-utilities call
+    REQUEST_TIMEOUT = (5, 15)
+    
+    def __init__(self, email: str = "bioquery@example.com", tool: str = "bioquery-assistant",
+                 cache_path: Optional[str] = None):
+        """
+        Initialize NCBI service with contact information.
+        
+        Args:
+            email: Contact address sent to NCBI with every request
+            tool: Tool name sent to NCBI with every request
+            cache_path: Optional SQLite file that keeps search results for a
+                day across restarts and worker processes
+        """
         self.email = email
         self.tool = tool
         self.rate_limit_delay = 0.34  # ~3 requests per second for free tier
+        # Earliest time the next E-utilities request may start; see _throttle
+        self._next_request_ts = 0.0
+        self._throttle_lock = threading.Lock()
+        # esearch and efetch hit the same host back to back; one session lets
+        # the second call reuse the first call's keep-alive connection
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = f"{tool} ({email})"
+        # NCBI answers bursts over the rate limit with 429 and has occasional
+        # 5xx blips; both are retried with backoff (honouring Retry-After)
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False
+            )
+        ))
+        # PubMed results for the same search barely change within an hour, so
+        # repeated searches are answered from memory instead of NCBI
+        self._search_cache = TTLCache(maxsize=1024, ttl=3600)
+        self._search_cache_lock = threading.Lock()
+        self._disk_cache = DiskCache(cache_path) if cache_path else None
+        # Runs search_many's queries side by side; three workers match the
+        # free tier's three requests per second
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="ncbi")
+        
+    def _throttle(self) -> None:
+        """
+        Wait until this process may send another request under NCBI's rate limit.
         
-    def search_pubmed(self, query: str, max_results: int = 5, sort: str = "relevance") -> List[Dict]:
+        Each caller reserves the next free slot, rate_limit_delay apart, and
+        sleeps only for whatever part of that gap has not already passed, so
+        a request after an idle period goes out immediately.
+        """
+        with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_ts)
+            self._next_request_ts = slot + self.rate_limit_delay
+        
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def search_pubmed(self, query: str, max_results: int = 5, sort: str = "relevance",
+                      mindate: Optional[str] = None, maxdate: Optional[str] = None) -> List[Article]:
         """
         Search PubMed for articles matching the query.
         
@@ -27,42 +161,85 @@ class NCBIService:
             query: Search terms
             max_results: Maximum number of results to return
             sort: Sort order ('relevance', 'pub_date', 'author')
+            mindate: Optional earliest publication date (YYYY/MM/DD, YYYY/MM or YYYY)
+            maxdate: Latest publication date; required by NCBI when mindate is set
             
         Returns:
-            List of article dictionaries with title, authors, abstract, etc.
+            List of articles with title, authors, abstract, etc.
         """
-        try:
-            # Step 1: Search for PMIDs
-            search_url = f"{self.BASE_URL}esearch.fcgi"
-            search_params = {
-                "db": "pubmed",
-                "term": query,
-                "retmax": max_results,
-                "sort": sort,
-                "email": self.email,
-                "tool": self.tool
-            }
-            
-            response = requests.get(search_url, params=search_params)
-            response.raise_for_status()
-            
-            # Parse XML response to get PMIDs
-            root = ET.fromstring(response.content)
-            pmids = [id_elem.text for id_elem in root.findall(".//Id")]
-            
-            if not pmids:
+        key = (query, max_results, sort, mindate, maxdate)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(key)
+        if cached is not None:
+            return cached
+
+        disk_key = orjson.dumps(key).decode()
+        stored = self._disk_cache.get(disk_key) if self._disk_cache else None
+
+        if stored is not None:
+            articles = [Article(**{**fields, "authors": tuple(fields["authors"])}) for fields in stored]
+        else:
+            try:
+                articles = self._search_pubmed_uncached(query, max_results, sort, mindate, maxdate)
+            except _NCBI_ERRORS:
+                # Failures are not cached so the next request retries NCBI
+                logger.warning("PubMed search failed for query=%r", query, exc_info=True)
                 return []
-            
-            time.sleep(self.rate_limit_delay)
-            
-            # Step 2: Fetch article details
-            return self._fetch_article_details(pmids)
-            
-        except Exception as e:
-            print(f"Error searching PubMed: {e}")
+
+            if self._disk_cache:
+                self._disk_cache.set(disk_key, articles)
+
+        with self._search_cache_lock:
+            self._search_cache[key] = articles
+        return articles
+
+    def _search_pubmed_uncached(self, query: str, max_results: int, sort: str,
+                                mindate: Optional[str] = None, maxdate: Optional[str] = None) -> List[Article]:
+        """Run esearch then efetch against NCBI, raising on any failure."""
+        # Step 1: Search for PMIDs
+        pmids = self._search_pmids(query, max_results, sort, mindate, maxdate)
+        
+        if not pmids:
             return []
+        
+        # Step 2: Fetch article details
+        return self._fetch_article_details(pmids)
+    
+    def _search_pmids(self, query: str, max_results: int, sort: str,
+                      mindate: Optional[str] = None, maxdate: Optional[str] = None) -> List[str]:
+        """Run esearch for a query and return the matching PMIDs in rank order."""
+        search_url = f"{self.BASE_URL}esearch.fcgi"
+        search_params = {
+            "db": "pubmed",
+            "term": query,
+            "retmax": max_results,
+            "sort": sort,
+            "email": self.email,
+            "tool": self.tool
+        }
+        if mindate:
+            # Filtered by NCBI's date index instead of a term in the query
+            search_params.update(datetype="pdat", mindate=mindate, maxdate=maxdate)
+        
+        # Parse PMIDs as the body streams in. IdList precedes the query
+        # translation details, so the rest of the body is never read.
+        pmids = []
+        self._throttle()
+        with self._session.get(search_url, params=search_params, stream=True,
+                               timeout=self.REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True  # let urllib3 undo gzip encoding
+            
+            for _, elem in ET.iterparse(response.raw, events=("end",), tag=("Id", "IdList"),
+                                        resolve_entities=False, no_network=True):
+                if elem.tag == "Id":
+                    pmids.append(elem.text)
+                else:
+                    break
+        
+        return pmids
     
-    def _fetch_article_details(self, pmids: List[str]) -> List[Dict]:
+    def _fetch_article_details(self, pmids: List[str]) -> List[Article]:
         """Fetch detailed information for a list of PMIDs."""
         fetch_url = f"{self.BASE_URL}efetch.fcgi"
         fetch_params = {
@@ -73,93 +250,162 @@ class NCBIService:
             "tool": self.tool
         }
         
-        response = requests.get(fetch_url, params=fetch_params)
-        response.raise_for_status()
-        
         articles = []
-        root = ET.fromstring(response.content)
         
-        for article_elem in root.findall(".//PubmedArticle"):
-            article_data = self._parse_article(article_elem)
-            if article_data:
-                articles.append(article_data)
+        # Parse articles as the body streams in instead of buffering the whole
+        # payload and building a full tree; each article is freed once parsed
+        self._throttle()
+        with self._session.get(fetch_url, params=fetch_params, stream=True,
+                               timeout=self.REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True  # let urllib3 undo gzip encoding
+            
+            for _, elem in ET.iterparse(response.raw, events=("end",), tag="PubmedArticle",
+                                        resolve_entities=False, no_network=True):
+                article_data = self._parse_article(elem)
+                if article_data:
+                    articles.append(article_data)
+                
+                # Free the article and the already-parsed siblings before it
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+                
+                # Every requested article is in hand; skip the rest of the body
+                if len(articles) >= len(pmids):
+                    break
         
         return articles
     
-    def _parse_article(self, article_elem) -> Optional[Dict]:
-        """Parse a single article XML element into a dictionary."""
+    def _parse_article(self, article_elem) -> Optional[Article]:
+        """Parse a single article XML element into an Article."""
         try:
-            # Extract basic information
-            article = article_elem.find(".//Article")
+            # Paths are anchored to the PubMed DTD layout so lookups go straight
+            # to the element instead of walking the whole subtree
+            article = article_elem.find("MedlineCitation/Article")
             if article is None:
                 return None
             
             # Get PMID
-            pmid_elem = article_elem.find(".//PMID")
-            pmid = pmid_elem.text if pmid_elem is not None else "Unknown"
+            pmid = article_elem.findtext("MedlineCitation/PMID", "Unknown")
             
             # Get title
-            title_elem = article.find(".//ArticleTitle")
-            title = title_elem.text if title_elem is not None else "No title available"
+            title = article.findtext("ArticleTitle", "No title available")
             
             # Get authors
             authors = []
-            for author_elem in article.findall(".//Author"):
-                last_name = author_elem.find(".//LastName")
-                first_name = author_elem.find(".//ForeName")
+            for author_elem in self._AUTHORS_XPATH(article):
+                last_name = author_elem.findtext("LastName")
                 if last_name is not None:
-                    author_name = last_name.text
-                    if first_name is not None:
-                        author_name += f", {first_name.text}"
-                    authors.append(author_name)
+                    first_name = author_elem.findtext("ForeName")
+                    authors.append(f"{last_name}, {first_name}" if first_name is not None else last_name)
             
             # Get abstract
-            abstract_elem = article.find(".//Abstract/AbstractText")
-            abstract = abstract_elem.text if abstract_elem is not None else "No abstract available"
+            abstract = article.findtext("Abstract/AbstractText", "No abstract available")
             
             # Get publication year
-            pub_date = article.find(".//PubDate/Year")
-            year = pub_date.text if pub_date is not None else "Unknown"
+            year = article.findtext("Journal/JournalIssue/PubDate/Year", "Unknown")
             
             # Get journal
-            journal_elem = article.find(".//Journal/Title")
-            journal = journal_elem.text if journal_elem is not None else "Unknown journal"
+            journal = article.findtext("Journal/Title", "Unknown journal")
             
-            return {
-                "pmid": pmid,
-                "title": title,
-                "authors": authors[:3],  # Limit to first 3 authors
-                "abstract": abstract[:500] + "..." if len(abstract) > 500 else abstract,
-                "year": year,
-                "journal": journal,
-                "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-            }
+            return Article(
+                pmid=pmid,
+                title=title,
+                authors=tuple(authors[:3]),  # Limit to first 3 authors
+                abstract=_truncate_at_sentence(abstract),
+                year=year,
+                journal=journal,
+                url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+            )
             
-        except Exception as e:
-            print(f"Error parsing article: {e}")
+        except (AttributeError, TypeError, ValueError):
+            # Skip a malformed record rather than losing the whole batch
+            logger.warning("Could not parse PubMed article", exc_info=True)
             return None
     
-    def get_recent_papers(self, topic: str, max_results: int = 3) -> List[Dict]:
+    def search_many(self, queries: List[str], max_results: int = 5, sort: str = "relevance") -> List[List[Article]]:
+        """
+        Search PubMed for several queries concurrently.
+        
+        Args:
+            queries: Search terms, one PubMed search each
+            max_results: Maximum number of results per query
+            sort: Sort order ('relevance', 'pub_date', 'author')
+            
+        Returns:
+            One list of articles per query, in the order given.
+        """
+        return list(self._executor.map(lambda query: self.search_pubmed(query, max_results, sort), queries))
+    
+    def search_pubmed_batch(self, queries: List[str], max_results: int = 5,
+                            sort: str = "relevance") -> Dict[str, List[Article]]:
+        """
+        Search PubMed for several queries with a single efetch for all of them.
+        
+        The esearch calls run concurrently; the PMIDs they return are merged
+        and fetched in one request, then split back out per query.
+        
+        Args:
+            queries: Search terms, one PubMed search each
+            max_results: Maximum number of results per query
+            sort: Sort order ('relevance', 'pub_date', 'author')
+            
+        Returns:
+            Mapping of each query to its articles, in rank order.
+        """
+        def search(query):
+            try:
+                return self._search_pmids(query, max_results, sort)
+            except _NCBI_ERRORS:
+                logger.warning("PubMed search failed for query=%r", query, exc_info=True)
+                return []
+        
+        pmids_by_query = dict(zip(queries, self._executor.map(search, queries)))
+        
+        # Union in first-seen order; overlapping queries fetch shared papers once
+        all_pmids = list(dict.fromkeys(pmid for pmids in pmids_by_query.values() for pmid in pmids))
+        if not all_pmids:
+            return {query: [] for query in queries}
+        
+        try:
+            articles = self._fetch_article_details(all_pmids)
+        except _NCBI_ERRORS:
+            logger.warning("PubMed fetch failed for %d PMIDs", len(all_pmids), exc_info=True)
+            return {query: [] for query in queries}
+        
+        articles_by_pmid = {article.pmid: article for article in articles}
+        return {
+            query: [articles_by_pmid[pmid] for pmid in pmids if pmid in articles_by_pmid]
+            for query, pmids in pmids_by_query.items()
+        }
+    
+    def get_recent_papers(self, topic: str, max_results: int = 3) -> List[Article]:
         """Get recent papers on a specific topic (last 2 years)."""
-        # Add date filter for recent papers
-        query = f"{topic} AND (\"2023\"[Date - Publication] OR \"2024\"[Date - Publication] OR \"2025\"[Date - Publication])"
-        return self.search_pubmed(query, max_results, sort="pub_date")
+        two_years_ago = date.today() - timedelta(days=730)
+        # Open-ended upper bound: issue dates often run ahead of the epub
+        # date, and those forthcoming records are the newest results
+        return self.search_pubmed(topic, max_results, sort="pub_date",
+                                  mindate=two_years_ago.strftime("%Y/%m/%d"),
+                                  maxdate="3000")
     
-    def format_articles_for_llm(self, articles: List[Dict]) -> str:
+    def format_articles_for_llm(self, articles: List[Article]) -> str:
         """Format articles in a way that's useful for LLM context."""
         if not articles:
             return "No relevant articles found."
         
-        formatted = "Recent relevant research:\n\n"
+        parts = ["Recent relevant research:\n\n"]
         for i, article in enumerate(articles, 1):
-            authors_str = ", ".join(article["authors"])
-            if len(article["authors"]) == 3:
+            authors_str = ", ".join(article.authors)
+            if len(article.authors) == 3:
                 authors_str += " et al."
             
-            formatted += f"{i}. **{article['title']}**\n"
-            formatted += f"   Authors: {authors_str} ({article['year']})\n"
-            formatted += f"   Journal: {article['journal']}\n"
-            formatted += f"   Abstract: {article['abstract']}\n"
-            formatted += f"   URL: {article['url']}\n\n"
+            parts.append(
+                f"{i}. **{article.title}**\n"
+                f"   Authors: {authors_str} ({article.year})\n"
+                f"   Journal: {article.journal}\n"
+                f"   Abstract: {article.abstract}\n"
+                f"   URL: {article.url}\n\n"
+            )
         
-        return formatted
\ No newline at end of file
+        return "".join(parts)
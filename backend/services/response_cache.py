@@ -0,0 +1,219 @@
+"""
+Semantic response cache for the chat endpoint.
+Serves stored answers for near-duplicate questions so rephrased queries skip the LLM call.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import orjson
+
+# Unicode letters and digits, so μM, α-tubulin and IFN-γ keep their symbols
+_TOKEN_RE = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+
+# Function words that carry no meaning for matching. Negations are kept on
+# purpose: "PCR working" and "PCR not working" must never share an answer.
+# The single letters are contraction leftovers ("I'm", "it's"); after a
+# number they are units ("1 M", "30 s") and are kept.
+_STOPWORDS = frozenset({
+    "a", "an", "the", "my", "i", "me", "we", "our", "you", "your",
+    "m", "s", "re", "ve", "ll", "d",
+    "is", "are", "was", "were", "be", "been", "am", "do", "does", "did",
+    "to", "of", "in", "on", "for", "with", "at", "by", "from", "and", "or",
+    "it", "its", "this", "that", "these", "those", "what", "how", "can",
+    "should", "would", "could", "please", "some", "any", "about"
+})
+
+
+# Tokens that change an answer outright when they differ: negations,
+# anything with a digit (temperatures, sizes, gene names such as p53), units
+# and Greek letters (μM vs M, α- vs β-tubulin). Two queries only match when
+# these agree exactly, in order.
+_NEGATIONS = frozenset({"not", "no", "never", "without", "none", "nor"})
+_UNITS = frozenset({
+    "m", "mm", "μm", "um", "nm", "pm", "l", "ml", "μl", "ul", "g", "mg", "μg", "ug", "ng",
+    "bp", "kb", "kda", "s", "sec", "min", "h", "hr", "c", "rpm", "v", "u"
+})
+_DIGIT_RE = re.compile(r"\d")
+_GREEK_RE = re.compile(r"[\u0370-\u03ff]")
+
+
+class SemanticCache:
+    """LRU cache of chat responses matched by cosine similarity of query term vectors."""
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, max_term_changes: int = 1,
+                 ttl: float = 86400):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity of the word and word-pair vectors
+            max_entries: Size limit of each partition
+            max_term_changes: How many distinct words may be added or dropped
+                between two matching queries; a substituted word counts twice
+            ttl: Default lifetime of an entry in seconds
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_term_changes = max_term_changes
+        self.ttl = ttl
+        self._partitions: Dict[Hashable, OrderedDict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tokenize(text: str) -> Tuple[str, ...]:
+        """Casefold a query and keep its content words in order."""
+        # casefold() also maps the micro sign (µ) onto Greek mu (μ)
+        text = text.casefold().replace("’", "'").replace("n't", " not")
+        tokens = []
+        previous = ""
+        for token in _TOKEN_RE.findall(text):
+            if token not in _STOPWORDS or _DIGIT_RE.search(previous):
+                tokens.append(token)
+            previous = token
+        return tuple(tokens)
+
+    @staticmethod
+    def embed(tokens: Tuple[str, ...]) -> Tuple[Dict[str, int], float]:
+        """Turn a query's tokens into a sparse vector of words and adjacent word pairs, and its norm."""
+        # Word pairs make the vector sensitive to order, so "p53 activates
+        # MDM2" and "MDM2 activates p53" are not near-duplicates
+        counts = Counter(tokens)
+        counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        norm = math.sqrt(sum(c * c for c in counts.values()))
+        return counts, norm
+
+    @staticmethod
+    def _entry(tokens: Tuple[str, ...], response: Optional[Dict], expires: float) -> Tuple:
+        """Precompute everything lookup() compares against for a stored query."""
+        vector, norm = SemanticCache.embed(tokens)
+        guard = tuple(
+            token for previous, token in zip(("",) + tokens, tokens)
+            if token in _NEGATIONS or token in _UNITS or _DIGIT_RE.search(token)
+            or _GREEK_RE.search(token) or _DIGIT_RE.search(previous)
+        )
+        return frozenset(tokens), guard, vector, norm, response, expires
+
+    def lookup(self, query: str, partition: Hashable) -> Optional[Dict]:
+        """
+        Find a stored response for a query similar to this one.
+
+        Args:
+            query: User message
+            partition: Context key (e.g. query type, prompt and literature
+                flag); only entries stored under the same partition can match
+
+        Returns:
+            The cached response, or None when nothing is similar enough.
+        """
+        tokens = self.tokenize(query)
+        if not tokens:
+            return None
+        terms, guard, vector, norm, _, _ = self._entry(tokens, None, 0)
+        now = time.time()
+
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if not entries:
+                return None
+
+            best_key, best_score = None, 0.0
+            expired = []
+            for key, (other_terms, other_guard, other, other_norm, _, expires) in entries.items():
+                if expires <= now:
+                    expired.append(key)
+                    continue
+                if other_guard != guard or len(terms ^ other_terms) > self.max_term_changes:
+                    continue
+                dot = sum(count * other.get(term, 0) for term, count in vector.items())
+                score = dot / (norm * other_norm)
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            for key in expired:
+                del entries[key]
+
+            if best_score < self.threshold:
+                return None
+
+            entries.move_to_end(best_key)
+            return entries[best_key][4]
+
+    def store(self, query: str, partition: Hashable, response: Dict, ttl: Optional[float] = None) -> None:
+        """
+        Store a response, evicting the least recently used entry when full.
+
+        Args:
+            query: User message
+            partition: Context key, as passed to lookup()
+            response: Payload to serve for similar queries
+            ttl: Lifetime in seconds, when shorter-lived than the cache default
+                (e.g. answers quoting "recent" literature)
+        """
+        tokens = self.tokenize(query)
+        if not tokens:
+            return
+
+        entry = self._entry(tokens, response, time.time() + (self.ttl if ttl is None else ttl))
+        with self._lock:
+            entries = self._partitions.setdefault(partition, OrderedDict())
+            entries[tokens] = entry
+            entries.move_to_end(tokens)
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def save(self, path: str) -> None:
+        """Write every unexpired entry to a JSON file, replacing it atomically."""
+        now = time.time()
+        with self._lock:
+            records = [
+                [list(partition), list(tokens), response, expires]
+                for partition, entries in self._partitions.items()
+                for tokens, (_, _, _, _, response, expires) in entries.items()
+                if expires > now
+            ]
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(records))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        Restore the unexpired entries written by save().
+
+        Args:
+            path: File produced by save()
+
+        Returns:
+            Number of entries loaded (0 when the file does not exist yet).
+        """
+        try:
+            with open(path, "rb") as f:
+                records = orjson.loads(f.read())
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for record in records:
+                # Files from before entries carried an expiry have three
+                # fields per record; without a timestamp they are dropped
+                if len(record) != 4:
+                    continue
+                partition, tokens, response, expires = record
+                if expires <= now:
+                    continue
+                tokens = tuple(tokens)
+                entries = self._partitions.setdefault(tuple(partition), OrderedDict())
+                entries[tokens] = self._entry(tokens, response, expires)
+                if len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                loaded += 1
+        return loaded
@@ -0,0 +1,93 @@
+"""Checks format_response against the original, unoptimized implementation."""
+
+import random
+import re
+
+import pytest
+
+from app import format_response
+
+
+def _baseline_format_response(response_text):
+    """format_response as first written: one regex pass per rule, no fast paths."""
+    response_text = re.sub(r'(\d+\.)\s*\*\*([^*]+)\*\*:', r'\n\n### \1 \2\n', response_text)
+    response_text = re.sub(r'\\?\[([^]]+)\\?\]', r'`\1`', response_text)
+    response_text = re.sub(r'^(\d+)\.\s+\*\*([^*]+)\*\*:', r'#### **Step \1: \2**', response_text, flags=re.MULTILINE)
+    response_text = re.sub(r'\*Note:([^*]+)\*', r'\n> 📝 **Note:** \1\n', response_text)
+    response_text = re.sub(r'\*Warning:([^*]+)\*', r'\n> ⚠️ **Warning:** \1\n', response_text)
+    response_text = re.sub(r'\*Tip:([^*]+)\*', r'\n> 💡 **Tip:** \1\n', response_text)
+    response_text = re.sub(r'\*Success:([^*]+)\*', r'\n> ✅ **Success:** \1\n', response_text)
+    response_text = re.sub(r'\*Critical:([^*]+)\*', r'\n> 🚨 **Critical:** \1\n', response_text)
+    response_text = re.sub(r'\*Protocol:([^*]+)\*', r'\n> 🧪 **Protocol:** \1\n', response_text)
+    response_text = re.sub(r'\*Troubleshoot:([^*]+)\*', r'\n> 🔧 **Troubleshoot:** \1\n', response_text)
+    response_text = re.sub(r'\*Validate:([^*]+)\*', r'\n> ✓ **Validate:** \1\n', response_text)
+    response_text = re.sub(r'\*\*([A-Z][A-Z\s]+):\*\*', r'\n\n## \1\n', response_text)
+    response_text = re.sub(r'\*\*([A-Z][a-z\s]+):\*\*', r'\n\n### \1\n', response_text)
+    response_text = re.sub(r'(\w+):\s*([0-9.-]+[°μM%x\s]*[A-Za-z]*)', r'**\1:** `\2`', response_text)
+    response_text = re.sub(r'(\d+\.?\d*)\s*(mM|μM|nM|pM|mg/mL|μg/mL|ng/mL|U/μL|units/mL)', r'`\1 \2`', response_text)
+    response_text = re.sub(r'(\d+\.?\d*)\s*°C', r'`\1°C`', response_text)
+    response_text = re.sub(r'(\d+\.?\d*)\s*(min|minute|hr|hour|sec|second|day|week)', r'`\1 \2`', response_text)
+    response_text = re.sub(r'\n\n+', '\n\n', response_text)
+    response_text = re.sub(r'\(High confidence\)', r'`🔴 High Confidence`', response_text)
+    response_text = re.sub(r'\(Medium confidence\)', r'`🟡 Medium Confidence`', response_text)
+    response_text = re.sub(r'\(Low confidence\)', r'`🟢 Low Confidence`', response_text)
+    response_text = re.sub(r'^- ', r'• ', response_text, flags=re.MULTILINE)
+    response_text = re.sub(r'^(\d+)\. ', r'\1. ', response_text, flags=re.MULTILINE)
+    response_text = re.sub(r'```\n(.*?)\n```', r'```\n\1\n```', response_text, flags=re.DOTALL)
+    return response_text.strip()
+
+
+_CALLOUT_LABELS = ["Note", "Warning", "Tip", "Success", "Critical", "Protocol", "Troubleshoot", "Validate"]
+
+# Fragments of every marker some pass acts on, plus near misses, so random
+# concatenations produce well-formed, malformed and overlapping markup
+_FRAGMENTS = [
+    "*", "**", " text ", "x", " ", "-", "%", "12.5", "μM", "\n", "\n\n\n", "- ", "```\n",
+    "1. ", "1. **Step**:", "ABC:", "Abc:", "**ABC:**", "**Abc def:**", ": 12", "Temp: 37",
+    "[a]", "\\[x\\]", "(Low confidence)", "(Medium confidence)", "(High confidence)",
+    "37°C", "37 °C", "5 min", "2 hours", "30 sec", "1 day", "10 mM", "0.5 μM", "5 ng/mL", "1 U/μL",
+] + [f"*{label}:" for label in _CALLOUT_LABELS] + [f"{label}:" for label in _CALLOUT_LABELS]
+
+
+def _generated_corpus(size=5000, seed=7):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(1, 20))) for _ in range(size)]
+
+
+_RESPONSES = [
+    "Plain prose answer with no markup at all.\n\n\n\nSecond paragraph.",
+    "",
+    """**DIAGNOSIS:**
+- Primary issue: no amplification (High confidence)
+- Likely causes: primer design (Medium confidence)
+
+**IMMEDIATE ACTIONS:**
+1. **Check template**: quantify with Nanodrop
+2. Verify primers at 0.5 μM
+3. Run gradient 55-65°C for 30 sec
+
+- *Note: keep on ice* and *Warning: toxic* plus *Tip: use fresh dNTPs*
+*Success: bands visible* *Critical: contamination* *Protocol: do X* *Troubleshoot: retry* *Validate: sequence*
+
+The formula \\[C1V1 = C2V2\\] and [Tm = 4(G+C) + 2(A+T)] apply.
+
+```
+95°C 3 min
+```
+Concentration 10 mg/mL, 5 ng/mL, 1 U/μL, 3 units/mL and 2 days, 1 week.
+(Low confidence)""",
+    # Back-to-back callouts missing their closing asterisk
+    "*Note: first *Note: second*",
+    "*Tip: unclosed *Warning: closed* after",
+    "*Validate:*Tip:[a]\n**",
+]
+
+
+@pytest.mark.parametrize("text", _RESPONSES)
+def test_matches_baseline_on_responses(text):
+    assert format_response(text) == _baseline_format_response(text)
+
+
+def test_matches_baseline_on_generated_corpus():
+    mismatches = [text for text in _generated_corpus() if format_response(text) != _baseline_format_response(text)]
+    assert mismatches == []
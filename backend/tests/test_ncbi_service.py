@@ -0,0 +1,146 @@
+"""Tests for NCBIService's streaming esearch/efetch parsing against recorded XML."""
+
+import io
+import re
+from pathlib import Path
+
+from services.ncbi_service import Article, NCBIService
+
+FIXTURES = Path(__file__).parent / "fixtures"
+ESEARCH = {
+    "crispr": (FIXTURES / "esearch_crispr.xml").read_bytes(),
+    "knockout": (FIXTURES / "esearch_knockout.xml").read_bytes(),
+}
+EFETCH = (FIXTURES / "efetch.xml").read_bytes()
+_ARTICLE_RE = re.compile(rb"<PubmedArticle>.*?<PMID[^>]*>(\d+)</PMID>.*?</PubmedArticle>\n", re.DOTALL)
+
+
+def _efetch_body(ids):
+    """Answer efetch like NCBI does: only the requested records, in the requested order."""
+    records = {match.group(1).decode(): match.group(0) for match in _ARTICLE_RE.finditer(EFETCH)}
+    head = EFETCH[:EFETCH.index(b"<PubmedArticle>")]
+    return head + b"".join(records[pmid] for pmid in ids if pmid in records) + b"</PubmedArticleSet>\n"
+
+
+def _cut_after(body, closing_tag, occurrence=1):
+    """Truncate a body after a closing tag and append a tag mismatch.
+
+    A parser that reads past the cut raises, so parsing only succeeds when
+    the service stops at that tag.
+    """
+    end = -1
+    for _ in range(occurrence):
+        end = body.index(closing_tag, end + 1)
+    return body[:end + len(closing_tag)] + b"</Truncated>"
+
+
+class _FakeResponse:
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeSession:
+    """Stands in for requests.Session, answering E-utilities calls from fixtures."""
+
+    def __init__(self, esearch=None, efetch=None):
+        self.esearch = esearch or ESEARCH
+        self.efetch = efetch
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls.append((endpoint, params))
+        if endpoint == "esearch.fcgi":
+            return _FakeResponse(self.esearch[params["term"]])
+        return _FakeResponse(self.efetch or _efetch_body(params["id"].split(",")))
+
+
+def _service(session):
+    service = NCBIService()
+    service._session = session
+    service.rate_limit_delay = 0
+    return service
+
+
+def test_search_parses_recorded_articles():
+    session = _FakeSession()
+    articles = _service(session).search_pubmed("crispr", max_results=2)
+
+    assert [article.pmid for article in articles] == ["38100001", "38100002"]
+    first = articles[0]
+    assert isinstance(first, Article)
+    assert first.title == "Guide RNA design rules for efficient CRISPR knockout."
+    assert first.year == "2024"
+    assert first.journal == "Nucleic acids research"
+    assert first.url == "https://pubmed.ncbi.nlm.nih.gov/38100001/"
+    assert [endpoint for endpoint, _ in session.calls] == ["esearch.fcgi", "efetch.fcgi"]
+    assert session.calls[1][1]["id"] == "38100001,38100002"
+
+
+def test_authors_without_last_name_are_skipped_and_capped_at_three():
+    first = _service(_FakeSession()).search_pubmed("crispr", max_results=2)[0]
+    assert first.authors == ("Doe, Jane", "Roe", "Smith, Ann")
+
+
+def test_long_abstract_is_cut_at_a_sentence_and_marked():
+    first = _service(_FakeSession()).search_pubmed("crispr", max_results=2)[0]
+    assert first.abstract.endswith("efficiency. ...")
+    assert len(first.abstract) <= 500 + len(" ...")
+
+
+def test_abstract_text_holding_only_markup_is_empty():
+    second = _service(_FakeSession()).search_pubmed("crispr", max_results=2)[1]
+    assert second.abstract == ""
+
+
+def test_missing_fields_fall_back_to_defaults():
+    third = _service(_FakeSession()).search_pubmed("knockout", max_results=2)[1]
+    assert third.pmid == "38100003"
+    assert third.abstract == "No abstract available"
+    assert third.year == "Unknown"
+    assert third.authors == ()
+
+
+def test_esearch_stops_at_id_list():
+    session = _FakeSession(esearch={"crispr": _cut_after(ESEARCH["crispr"], b"</IdList>")})
+    assert _service(session)._search_pmids("crispr", 2, "relevance") == ["38100001", "38100002"]
+
+
+def test_efetch_stops_once_requested_articles_are_parsed():
+    session = _FakeSession(efetch=_cut_after(EFETCH, b"</PubmedArticle>", occurrence=2))
+    articles = _service(session)._fetch_article_details(["38100001", "38100002"])
+    assert [article.pmid for article in articles] == ["38100001", "38100002"]
+
+
+def test_parsed_articles_are_freed_from_the_tree():
+    # Sibling clearing must not disturb articles still to come
+    articles = _service(_FakeSession())._fetch_article_details(["38100001", "38100002", "38100003"])
+    assert [article.pmid for article in articles] == ["38100001", "38100002", "38100003"]
+    assert [article.title for article in articles] == [
+        "Guide RNA design rules for efficient CRISPR knockout.",
+        "Validating knockout clones by amplicon sequencing.",
+        "Knockout screens without an abstract.",
+    ]
+
+
+def test_batch_fetches_once_and_splits_per_query():
+    session = _FakeSession()
+    results = _service(session).search_pubmed_batch(["crispr", "knockout"], max_results=2)
+
+    assert {query: [a.pmid for a in articles] for query, articles in results.items()} == {
+        "crispr": ["38100001", "38100002"],
+        "knockout": ["38100002", "38100003"],
+    }
+    efetch_calls = [params for endpoint, params in session.calls if endpoint == "efetch.fcgi"]
+    assert [params["id"] for params in efetch_calls] == ["38100001,38100002,38100003"]
+    # The paper both queries found is parsed once and shared
+    assert results["crispr"][1] is results["knockout"][0]
@@ -0,0 +1,100 @@
+"""Tests for the semantic response cache's near-duplicate matching."""
+
+import time
+
+import pytest
+
+from services.response_cache import SemanticCache
+
+PARTITION = ("general_bio", "general_bio", False)
+
+
+def _cache_with(question):
+    cache = SemanticCache()
+    cache.store(question, PARTITION, {"response": question})
+    return cache
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("PCR not working", "my PCR isn't working"),
+    ("PCR not working", "My PCR isn’t working"),
+    ("How many biological replicates do I need for RNA-seq experiment?",
+     "How many biological replicates do I need for an RNA-seq experiment"),
+    ("Dissolve to 1 μM in water", "dissolve to 1 µM in water"),
+])
+def test_near_duplicates_hit(stored, asked):
+    assert _cache_with(stored).lookup(asked, PARTITION) == {"response": stored}
+
+
+@pytest.mark.parametrize("stored, asked", [
+    # Units and Greek letters
+    ("Dissolve to 1 M in water", "Dissolve to 1 μM in water"),
+    ("Dissolve to 1 mM in water", "Dissolve to 1 μM in water"),
+    ("Add 5 μL of template", "Add 5 mL of template"),
+    ("Which antibody detects α-tubulin in fixed cells?",
+     "Which antibody detects β-tubulin in fixed cells?"),
+    ("How does IFN-γ signal through JAK/STAT?", "How does IFN-α signal through JAK/STAT?"),
+    # Word order
+    ("Does MDM2 activate p53 in response to DNA damage in fibroblasts?",
+     "Does p53 activate MDM2 in response to DNA damage in fibroblasts?"),
+    ("does actin bind myosin directly in smooth muscle cells during contraction",
+     "does myosin bind actin directly in smooth muscle cells during contraction"),
+    # Negations
+    ("PCR not working", "PCR is working"),
+    ("I only see a faint band on my agarose gel after thirty cycles at 58C",
+     "I do not see a faint band on my agarose gel after thirty cycles at 58C"),
+    # Numbers and single substituted words in long questions
+    ("I'm amplifying a 1.2kb fragment from mouse genomic DNA with primers annealing at 58C",
+     "I'm amplifying a 1.2kb fragment from mouse genomic DNA with primers annealing at 68C"),
+    ("I'm amplifying a 1.2kb fragment from mouse genomic DNA with primers annealing at 58C",
+     "I'm amplifying a 1.2kb fragment from human genomic DNA with primers annealing at 58C"),
+])
+def test_distinct_questions_miss(stored, asked):
+    assert _cache_with(stored).lookup(asked, PARTITION) is None
+
+
+def test_unit_after_number_survives_stopwords():
+    assert SemanticCache.tokenize("Dissolve to 1 M in water") == ("dissolve", "1", "m", "water")
+    assert SemanticCache.tokenize("I'm stuck") == ("stuck",)
+
+
+def test_partitions_are_separate():
+    cache = _cache_with("PCR not working")
+    assert cache.lookup("PCR not working", ("general_bio", "general_assistant", False)) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    _cache_with("PCR not working").save(path)
+
+    restored = SemanticCache()
+    assert restored.load(path) == 1
+    assert restored.lookup("my PCR isn't working", PARTITION) == {"response": "PCR not working"}
+
+
+def test_entries_expire(monkeypatch):
+    cache = SemanticCache(ttl=60)
+    cache.store("PCR not working", PARTITION, {"response": "default"})
+    cache.store("Western blot has no bands", PARTITION, {"response": "short"}, ttl=10)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 30)
+    assert cache.lookup("PCR not working", PARTITION) == {"response": "default"}
+    assert cache.lookup("Western blot has no bands", PARTITION) is None
+
+    monkeypatch.setattr(time, "time", lambda: now + 90)
+    assert cache.lookup("PCR not working", PARTITION) is None
+
+
+def test_load_skips_expired_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.json")
+    cache = SemanticCache(ttl=60)
+    cache.store("PCR not working", PARTITION, {"response": "kept"})
+    cache.store("Western blot has no bands", PARTITION, {"response": "expired"}, ttl=10)
+    cache.save(path)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 30)
+    restored = SemanticCache()
+    assert restored.load(path) == 1
+    assert restored.lookup("PCR not working", PARTITION) == {"response": "kept"}